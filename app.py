@@ -2,25 +2,63 @@
 
 import streamlit as st
 import os
-import googleapiclient.discovery
 from dotenv import load_dotenv
 import google.generativeai as genai
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.formatters import TextFormatter
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
+from google.api_core import exceptions as google_exceptions
 from datetime import datetime
-from docx import Document
-from docx.shared import Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
 import io
 import re
+import json
+import hashlib
+import hmac
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse, parse_qs
+import numpy as np
+from requests.adapters import HTTPAdapter
 import time
+import random
+import threading
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from cache import DiskCache
 
 RETRY_COUNT = 4
 RETRY_DELAY = 3
+CACHE_TTL = 3600  # Seconds to keep fetched transcripts and titles
+CACHE_MAX_ENTRIES = 1000  # Videos kept in the in-memory transcript/title caches
+DISK_CACHE_TTL = 86400  # Seconds to keep transcripts, titles and responses on disk
+YOUTUBE_OEMBED_URL = "https://www.youtube.com/oembed"
+TRANSCRIPT_LANGUAGES = ("en", "en-US", "en-GB")  # Preferred caption languages, in order
+GEMINI_MODEL = "gemini-1.5-flash-latest"
+# Q&A answers are short, so a smaller model trades little quality for faster first tokens
+QA_MODEL = "gemini-1.5-flash-8b-latest"
+EMBEDDING_MODEL = "models/text-embedding-004"
+GENERATION_CONFIG = {
+    'temperature': 0.7,
+    'top_p': 0.8,
+    'top_k': 40
+}
+RESPONSE_CACHE_SIZE = 256  # Max Gemini responses kept in memory
+MAX_CONCURRENT_CHUNKS = 8  # Concurrent Gemini calls when analyzing chunks
+GEMINI_BACKOFF_BASE = 2  # Seconds before the first retry, doubled after each failure
+# Gemini errors worth retrying; anything else (bad key, blocked prompt) fails at once
+TRANSIENT_GEMINI_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
+SINGLE_CALL_THRESHOLD = 400_000  # Characters (~100K tokens) summarized in one call
+MIN_TRANSCRIPT_LENGTH = 500  # Caption characters; shorter transcripts aren't worth summarizing
+MIN_RESPONSE_LENGTH = 80  # Shorter Gemini responses are retried
+MIN_QA_ANSWER_LENGTH = 1  # Short Q&A answers ("Yes, at 12:30.") are fine
+QA_CHUNK_SIZE = 2000  # Characters (~500 tokens) per retrieval window
+QA_CONTEXT_CHUNKS = 5  # Retrieval windows sent with each question
+VIDEO_LIMIT = 3  # Summaries the user can request per session
+PREFETCH_LIMIT = VIDEO_LIMIT  # Speculative fast summaries started per session
+QUESTION_LIMIT = 5  # Q&A questions per session
+QA_HISTORY_SIZE = QUESTION_LIMIT  # History never needs more than a session's questions
+DOCUMENT_CACHE_ENTRIES = 32  # Rendered summary documents kept in memory
 
 # Must be the first Streamlit command
 st.set_page_config(
@@ -29,46 +67,38 @@ st.set_page_config(
     layout="wide"
 )
 
-# Session state variables
-if "current_summary" not in st.session_state:
-    st.session_state.current_summary = None
-if "word_doc_binary" not in st.session_state:
-    st.session_state.word_doc_binary = None
-if "video_processed" not in st.session_state:
-    st.session_state.video_processed = False
-if "current_transcript" not in st.session_state:
-    st.session_state.current_transcript = None
-if "current_video_id" not in st.session_state:
-    st.session_state.current_video_id = None
-if "current_video_title" not in st.session_state:
-    st.session_state.current_video_title = None
-if "qa_history" not in st.session_state:
-    st.session_state.qa_history = []
-if "clear_input" not in st.session_state:
-    st.session_state.clear_input = False
-# Add these with your other session state variables near the top of the file
-if "video_count" not in st.session_state:
-    st.session_state.video_count = 0
-if "query_count" not in st.session_state:
-    st.session_state.query_count = 0
-if "fast_summary_generated" not in st.session_state:
-    st.session_state.fast_summary_generated = False
-    
-
-    
-# Load environment variables and configure Gemini
+# Session state variables and their defaults
+SESSION_DEFAULTS = {
+    "current_summary": None,
+    "video_processed": False,
+    "current_transcript": None,
+    "current_video_id": None,
+    "current_video_title": None,
+    "last_youtube_link": None,
+    "qa_history": deque(maxlen=QA_HISTORY_SIZE),
+    "qa_history_md": "",
+    "latest_qa": None,
+    "clear_input": False,
+    "video_count": 0,
+    "query_count": 0,
+    "fast_summary_generated": False,
+    "transcript_index": None,
+    "summary_prefetch": None,
+    "prefetch_count": 0,
+    "summary_incomplete": False,
+    "summary_generated_on": None,
+}
+for key, default in SESSION_DEFAULTS.items():
+    st.session_state.setdefault(key, default)
+
+# Load environment variables; Gemini is configured in main() once the key is known
 load_dotenv(override=True)
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 # Validate API keys
 if not os.getenv("GOOGLE_API_KEY"):
     st.error("Google API key is missing. Check your environment configuration.")
     st.stop()
 
-if not os.getenv("YOUTUBE_API_KEY"):
-    st.error("YouTube API key is missing. Check your environment configuration.")
-    st.stop()
-
 # Constants for prompts
 # Update CHUNK_PROMPT for better quote extraction
 CHUNK_PROMPT = """Analyze this portion of the video transcript and provide:
@@ -141,15 +171,42 @@ Format:
 
 Please synthesize this complete summary: """
 
+# Used when the whole transcript fits in one request
+SINGLE_PASS_PROMPT = """Analyze the complete video transcript below.
+For quotes and technical data, preserve exact wording and keep the [HH:MM:SS] timestamps.
+
+""" + FINAL_PROMPT
+
+# Shared instructions appended to every prompt's system instruction
+GENERATION_INSTRUCTIONS = """Important instructions:
+- Provide detailed, specific content
+- Include actual examples and quotes when available
+- Skip sections that have no meaningful content
+- Maintain proper formatting throughout
+- Do not generate placeholder or filler content"""
+
 FAST_SUMMARY_PROMPT = """Provide a concise executive summary of the video transcript. 
 - Limit the summary to 200-500 words. 
 - Focus on the main ideas, key insights, and central theme. 
 - Skip detailed quotes, technical terms, or extensive sections."""
 
+# Changes whenever the model or a prompt does, invalidating stored summaries
+PROMPT_VERSION = hashlib.sha256("\n".join([
+    GEMINI_MODEL, CHUNK_PROMPT, FINAL_PROMPT, FAST_SUMMARY_PROMPT,
+    SINGLE_PASS_PROMPT, GENERATION_INSTRUCTIONS
+]).encode("utf-8")).hexdigest()[:12]
+
 
 
 # Part 2: URL and Transcript Processing Functions
 
+# Standard (v= anywhere in the query), mobile, shortened, embedded, shorts
+# and live URLs in a single pass; video IDs are always 11 characters
+YOUTUBE_ID_RE = re.compile(
+    r'(?:youtube\.com/(?:watch\?(?:[^#]*&)?v=|embed/|shorts/|live/)|youtu\.be/)'
+    r'(?P<id>[a-zA-Z0-9_-]{11})'
+)
+
 def get_youtube_video_id(url):
     """
     Extract video ID from various YouTube URL formats including mobile versions.
@@ -163,38 +220,10 @@ def get_youtube_video_id(url):
         if not url:
             return None
             
-        # Common YouTube URL patterns
-        patterns = [
-            # Standard desktop URLs
-            r'(?:https?:\/\/)?(?:www\.)?youtube\.com\/watch\?v=([a-zA-Z0-9_-]+)',
-            # Mobile URLs
-            r'(?:https?:\/\/)?(?:www\.)?m\.youtube\.com\/watch\?v=([a-zA-Z0-9_-]+)',
-            # Shortened URLs
-            r'(?:https?:\/\/)?(?:www\.)?youtu\.be\/([a-zA-Z0-9_-]+)',
-            # Embedded URLs
-            r'(?:https?:\/\/)?(?:www\.)?youtube\.com\/embed\/([a-zA-Z0-9_-]+)',
-            # Mobile app sharing URLs
-            r'(?:https?:\/\/)?(?:www\.)?youtube\.com\/shorts\/([a-zA-Z0-9_-]+)'
-        ]
-        
-        # Try each pattern
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-                
-        # If no pattern matches, try parsing the URL
-        parsed_url = urlparse(url)
-        
-        # Handle standard youtube.com URLs
-        if parsed_url.hostname in ['www.youtube.com', 'youtube.com', 'm.youtube.com']:
-            query_params = parse_qs(parsed_url.query)
-            if 'v' in query_params:
-                return query_params['v'][0]
-                
-        # Handle youtu.be URLs
-        if parsed_url.hostname == 'youtu.be':
-            return parsed_url.path.lstrip('/')
+        # Match the combined YouTube URL pattern
+        match = YOUTUBE_ID_RE.search(url)
+        if match:
+            return match.group("id")
             
     except Exception as e:
         st.warning(f"Error parsing YouTube URL: {str(e)}")
@@ -202,19 +231,51 @@ def get_youtube_video_id(url):
     return None
 
 
-def get_youtube_title(video_id, youtube_link):
+@st.cache_resource
+def _disk_cache():
+    """Persistent cache shared across sessions and worker restarts."""
+    return DiskCache(max_age=DISK_CACHE_TTL)
+
+
+@st.cache_resource
+def _http_session():
+    """Shared HTTP session so YouTube requests reuse pooled keep-alive connections."""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    return session
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _fetch_youtube_title(video_id):
+    """
+    Fetch the raw video title from YouTube's oEmbed endpoint.
+    Cached per video ID; raises on HTTP errors so failures are not cached.
     """
-    Fetch video title using YouTube Data API v3.
+    title = _disk_cache().get_video_field(video_id, "title", max_age=DISK_CACHE_TTL)
+    if title is not None:
+        return title
+
+    response = _http_session().get(
+        YOUTUBE_OEMBED_URL,
+        params={"url": f"https://www.youtube.com/watch?v={video_id}", "format": "json"},
+        timeout=5
+    )
+    response.raise_for_status()
+    title = response.json().get("title")
+    if title:
+        _disk_cache().save_video(video_id, title=title)
+    return title
+
+
+def get_youtube_title(video_id, youtube_link, title_future=None):
+    """
+    Fetch video title using YouTube's oEmbed endpoint.
     If title is unavailable, fallback to using the video ID.
+    Pass title_future to use a fetch that is already in flight.
     """
     fallback_title = f"Video ID: {video_id} (Title: {youtube_link})"
     try:
-        youtube = googleapiclient.discovery.build(
-            "youtube", "v3", developerKey=os.getenv("YOUTUBE_API_KEY")
-        )
-        response = youtube.videos().list(part="snippet", id=video_id).execute()
-
-        title = response.get("items", [{}])[0].get("snippet", {}).get("title")
+        title = title_future.result() if title_future else _fetch_youtube_title(video_id)
         return title if title else fallback_title
     except Exception:
         st.warning("⚠️ Error retrieving video title. Falling back to Video ID.")
@@ -225,11 +286,11 @@ def get_youtube_title(video_id, youtube_link):
 def process_video_url(youtube_link):
     """
     Process YouTube URL with enhanced error handling and user feedback.
-    Returns video_id and transcript if successful, (None, None) if not.
+    Returns video_id, transcript and title if successful, (None, None, None) if not.
     """
     if not youtube_link:
         st.warning("⚠️ Please enter a YouTube URL")
-        return None, None
+        return None, None, None
 
     # Clean the URL
     youtube_link = youtube_link.strip()
@@ -239,54 +300,72 @@ def process_video_url(youtube_link):
     if not video_id:
         st.error("❌ Unable to extract Video ID. Please check the URL format.")
         st.info("💡 Supported formats:\n- youtube.com/watch?v=...\n- youtu.be/...\n- m.youtube.com/watch?v=...")
-        return None, None
+        return None, None, None
+
+    # Title and transcript come from independent endpoints, so fetch them together
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        title_future = executor.submit(_fetch_youtube_title, video_id)
+        transcript_future = executor.submit(_fetch_transcript, video_id)
 
     # Get video title
-    video_title = get_youtube_title(video_id, youtube_link)
+    video_title = get_youtube_title(video_id, youtube_link, title_future)
     if not video_title:
         st.warning("⚠️ Could not retrieve video title. Defaulting to video ID.")
 
     # Get transcript
-    transcript = extract_transcript(video_id)
+    transcript = extract_transcript(video_id, transcript_future)
     if not transcript:
-        return None, None
+        return None, None, None
+
+    # Don't spend a Gemini call on videos with barely any speech; measure the
+    # captions themselves, since each formatted line adds an "[HH:MM:SS] " prefix
+    caption_length = sum(len(item["text"]) for item in transcript_future.result())
+    if caption_length < MIN_TRANSCRIPT_LENGTH:
+        st.warning("⚠️ This video's transcript is too short to summarize.")
+        return None, None, None
         
-    return video_id, transcript
+    return video_id, transcript, video_title
 
 
 
 # Part 3: Text Processing and Content Generation Functions
 
 def chunk_text(text, chunk_size=10000):
-    """Split text into manageable chunks."""
-    words = text.split()
+    """Split text into manageable chunks, breaking on word boundaries."""
     chunks = []
-    current_chunk = []
-    current_length = 0
-    
-    for word in words:
-        if current_length + len(word) + 1 <= chunk_size:
-            current_chunk.append(word)
-            current_length += len(word) + 1
-        else:
-            chunks.append(' '.join(current_chunk))
-            current_chunk = [word]
-            current_length = len(word)
+    start = 0
+    length = len(text)
     
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
+    while start < length:
+        end = min(start + chunk_size, length)
+        next_start = end
+        if end < length:
+            # Break at the last space that keeps the chunk within chunk_size
+            split_at = text.rfind(' ', start, end + 1)
+            if split_at > start:
+                end = split_at
+                next_start = split_at + 1
+        
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = next_start
     return chunks
 
+MULTI_NEWLINE_RE = re.compile(r'\n{3,}')
+TABLE_ROW_BREAK_RE = re.compile(r'\|\s*\n\s*\|')
+BULLET_PREFIX_RE = re.compile(r'(?m)^\s*[-•]\s*')
+
 def format_response(response_text):
     """Clean up and standardize formatting of Gemini responses."""
     # Replace multiple newlines with double newline
-    cleaned = re.sub(r'\n{3,}', '\n\n', response_text)
+    cleaned = MULTI_NEWLINE_RE.sub('\n\n', response_text)
     
     # Ensure table headers are properly formatted
-    cleaned = re.sub(r'\|\s*\n\s*\|', '|\n|---', cleaned)
+    cleaned = TABLE_ROW_BREAK_RE.sub('|\n|---', cleaned)
     
     # Ensure consistent bullet point formatting
-    cleaned = re.sub(r'(?m)^\s*[-•]\s*', '- ', cleaned)
+    cleaned = BULLET_PREFIX_RE.sub('- ', cleaned)
     
     return cleaned
 
@@ -295,24 +374,69 @@ def format_response(response_text):
 def retry_transcript_extraction(video_id, retries=RETRY_COUNT, delay=RETRY_DELAY):
     """
     Retry logic for retrieving transcripts to handle temporary failures.
+    Prefers manually created English captions, then auto-generated ones.
+    Re-raises the last error once all attempts are exhausted, and at once
+    when the video simply has no usable transcript.
     """
+    # Imported lazily; only needed the first time a video is loaded
+    from youtube_transcript_api import (YouTubeTranscriptApi, NoTranscriptFound,
+                                        TranscriptsDisabled, VideoUnavailable)
+
     for attempt in range(retries):
         try:
-            return YouTubeTranscriptApi.get_transcript(video_id)
-        except Exception as e:
+            # One listing request, then fetch the best match directly
+            transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
+            try:
+                transcript = transcripts.find_manually_created_transcript(TRANSCRIPT_LANGUAGES)
+            except NoTranscriptFound:
+                transcript = transcripts.find_generated_transcript(TRANSCRIPT_LANGUAGES)
+            return transcript.fetch()
+        except (NoTranscriptFound, TranscriptsDisabled, VideoUnavailable):
+            raise  # Retrying will not make captions appear
+        except Exception:
             if attempt < retries - 1:
                 time.sleep(delay)
             else:
-                st.error(f"❌ Failed to retrieve transcript after {retries} attempts: {str(e)}")
-                return None
+                raise
 
-def extract_transcript(video_id):
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _fetch_transcript(video_id):
+    """
+    Fetch the raw transcript entries for a video.
+    Cached per video ID; failures raise and are therefore not cached.
+    """
+    transcript_list = _disk_cache().get_video_field(video_id, "transcript", max_age=DISK_CACHE_TTL)
+    if transcript_list is not None:
+        return transcript_list
+
+    transcript_list = retry_transcript_extraction(video_id)
+    if transcript_list:
+        _disk_cache().save_video(video_id, transcript=transcript_list)
+    return transcript_list
+
+def extract_transcript(video_id, transcript_future=None):
     """
     Enhanced transcript extraction with retry logic and improved error handling.
+    Pass transcript_future to use a fetch that is already in flight.
     """
+    from youtube_transcript_api import NoTranscriptFound, TranscriptsDisabled, VideoUnavailable
+
+    try:
+        transcript_list = transcript_future.result() if transcript_future else _fetch_transcript(video_id)
+    except NoTranscriptFound:
+        st.error("❌ No English captions are available for this video.")
+        return None
+    except TranscriptsDisabled:
+        st.error("❌ Captions are disabled for this video.")
+        return None
+    except VideoUnavailable:
+        st.error("❌ This video is unavailable. Check that it is public and the link is correct.")
+        return None
+    except Exception as e:
+        st.error(f"❌ Failed to retrieve transcript after {RETRY_COUNT} attempts: {str(e)}")
+        return None
+
     try:
-        # Retry logic to fetch transcript
-        transcript_list = retry_transcript_extraction(video_id)
         if not transcript_list:
             st.error("❌ Unable to retrieve transcript after multiple attempts.")
             return None
@@ -320,9 +444,9 @@ def extract_transcript(video_id):
         # Format the transcript if available
         formatted_transcript = []
         for item in transcript_list:
-            timestamp = int(item["start"])
-            time_str = f"[{timestamp // 3600:02d}:{(timestamp % 3600) // 60:02d}:{timestamp % 60:02d}]"
-            formatted_transcript.append(f"{time_str} {item['text']}")
+            hours, remainder = divmod(int(item["start"]), 3600)
+            minutes, seconds = divmod(remainder, 60)
+            formatted_transcript.append(f"[{hours:02d}:{minutes:02d}:{seconds:02d}] {item['text']}")
         
         return " ".join(formatted_transcript)
 
@@ -332,68 +456,331 @@ def extract_transcript(video_id):
 
 
 
-def generate_content(text, prompt, retry_count=3):
-    """Generate content using Gemini with enhanced error handling and content validation."""
-    formatted_prompt = f"""
-    {prompt}
-    
-    Important instructions:
-    - Provide detailed, specific content
-    - Include actual examples and quotes when available
-    - Skip sections that have no meaningful content
-    - Maintain proper formatting throughout
-    - Do not generate placeholder or filler content
-    
-    Content to analyze: {text}
+@st.cache_resource
+def _response_cache():
+    """Gemini responses keyed by request hash, shared across reruns and sessions."""
+    return {}
+
+def _user_content(text):
+    """The user turn sent to Gemini for text."""
+    return f"Content to analyze: {text}"
+
+def _response_cache_key(text, prompt, model_name=GEMINI_MODEL):
+    """
+    Build a stable sha256 key from exactly what is sent to Gemini, so editing the
+    shared instructions or the user turn also invalidates cached responses.
+    """
+    payload = json.dumps({
+        "system_instruction": _system_instruction(prompt),
+        "content": _user_content(text),
+        "model": model_name,
+        "config": GENERATION_CONFIG
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+@st.cache_resource
+def _event_loop():
+    """Background event loop that runs async Gemini calls for every session."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+async def _new_semaphore(limit):
+    """Create a semaphore from a coroutine, so it belongs to the loop running it."""
+    return asyncio.Semaphore(limit)
+
+def _system_instruction(prompt):
+    """
+    The prompt and shared instructions are identical across every chunk, so send
+    them as the system instruction and keep only the content in the user turn.
+    """
+    return f"{prompt}\n\n{GENERATION_INSTRUCTIONS}" if prompt else GENERATION_INSTRUCTIONS
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def _get_model(system_instruction, model_name=GEMINI_MODEL, api_key=None):
+    """
+    Share one GenerativeModel per system instruction, model and API key
+    across reruns and sessions instead of building one per call.
+    A model keeps the client it is first used with, hence the key in the cache key.
+    """
+    return genai.GenerativeModel(model_name,
+                                 generation_config=GENERATION_CONFIG,
+                                 system_instruction=system_instruction)
+
+@st.cache_resource
+def _gemini_config():
+    """Process-wide record of the API key genai is currently configured with."""
+    return {"api_key": None}
+
+def configure_gemini(api_key):
+    """Configure genai only when the key differs from the one already in use."""
+    config = _gemini_config()
+    if config["api_key"] != api_key:
+        genai.configure(api_key=api_key)
+        config["api_key"] = api_key
+
+def _current_model(prompt, model_name=GEMINI_MODEL):
+    """The shared model for prompt under the currently configured API key."""
+    return _get_model(_system_instruction(prompt), model_name,
+                      _gemini_config()["api_key"])
+
+def _get_cached_response(cache_key):
+    """Look a response up in memory, then on disk."""
+    cache = _response_cache()
+    if cache_key in cache:
+        return cache[cache_key]
+    cached_response = _disk_cache().get(f"response:{cache_key}")
+    if cached_response is not None:
+        cache[cache_key] = cached_response
+    return cached_response
+
+def _store_response(cache_key, response_text):
+    """Save a response in memory and on disk."""
+    cache = _response_cache()
+    # Evict the oldest entry once the cache is full
+    if len(cache) >= RESPONSE_CACHE_SIZE:
+        cache.pop(next(iter(cache)), None)
+    cache[cache_key] = response_text
+    _disk_cache().set(f"response:{cache_key}", response_text, expire=DISK_CACHE_TTL)
+
+def _retry_delay(attempt):
+    """Exponential backoff with jitter so concurrent retries don't hit Gemini together."""
+    return GEMINI_BACKOFF_BASE * 2 ** attempt + random.random()
+
+def _has_content(response_text, min_length=MIN_RESPONSE_LENGTH):
+    """Cheap sanity check that a response is more than an empty or stub reply."""
+    return (len(response_text) >= min_length
+            and any(c.isalpha() for c in response_text[:200]))
+
+def _generate_text(text, prompt, retry_count=3, use_cache=True, placeholder=None,
+                   model_name=GEMINI_MODEL, min_length=MIN_RESPONSE_LENGTH):
     """
+    Call Gemini and return the formatted response.
+    Without a placeholder it never touches the page, so it is safe to run from
+    worker threads; with one, tokens are streamed into it as they arrive.
+    Transient errors are retried with backoff; others are raised immediately.
+    Responses shorter than min_length are retried and never cached.
+    """
+    cache_key = _response_cache_key(text, prompt, model_name)
+    if use_cache:
+        cached_response = _get_cached_response(cache_key)
+        if cached_response is not None:
+            return cached_response
+
+    model = _current_model(prompt, model_name)
+    content = _user_content(text)
     
     for attempt in range(retry_count):
         try:
-            model = genai.GenerativeModel("gemini-1.5-flash-latest",
-                                        generation_config={
-                                            'temperature': 0.7,
-                                            'top_p': 0.8,
-                                            'top_k': 40
-                                        })
-            response = model.generate_content(formatted_prompt)
+            if placeholder is None:
+                response_text = model.generate_content(content).text
+            else:
+                # Render partial output as it streams in
+                parts = []
+                for chunk in model.generate_content(content, stream=True):
+                    parts.append(chunk.text)
+                    placeholder.markdown("".join(parts))
+                response_text = "".join(parts)
             
             # Format and validate the response
+            formatted_response = format_response(response_text)
+            
+            # Retry short or empty responses, and never cache one
+            if not _has_content(formatted_response, min_length):
+                if attempt < retry_count - 1:
+                    continue
+                return formatted_response
+            
+            if use_cache:
+                _store_response(cache_key, formatted_response)
+            return formatted_response
+        except TRANSIENT_GEMINI_ERRORS:
+            if attempt == retry_count - 1:
+                raise
+            time.sleep(_retry_delay(attempt))
+
+async def _generate_text_async(text, prompt, retry_count=3, use_cache=True):
+    """
+    Async counterpart of _generate_text for the shared event loop.
+    Never touches the page; transient errors are retried with backoff.
+    """
+    cache_key = _response_cache_key(text, prompt)
+    if use_cache:
+        cached_response = _get_cached_response(cache_key)
+        if cached_response is not None:
+            return cached_response
+
+    model = _current_model(prompt)
+    
+    for attempt in range(retry_count):
+        try:
+            response = await model.generate_content_async(_user_content(text))
             formatted_response = format_response(response.text)
             
-            # Check if response has actual content
-            if not re.search(r'[A-Za-z]{50,}', formatted_response):
+            # Retry short or empty responses, and never cache one
+            if not _has_content(formatted_response):
                 if attempt < retry_count - 1:
-                    continue  # Try again if response is too short/empty
+                    continue
+                return formatted_response
             
+            if use_cache:
+                _store_response(cache_key, formatted_response)
             return formatted_response
-        except Exception as e:
-            if "API key not valid" in str(e):
-                st.error("❌ Invalid API key. Please check your key and try again.")
-                st.stop()
+        except TRANSIENT_GEMINI_ERRORS:
             if attempt == retry_count - 1:
-                st.error(f"Error generating content: {str(e)}")
-                return None
-            continue
+                raise
+            await asyncio.sleep(_retry_delay(attempt))
+
+def report_generation_error(error):
+    """Show a Gemini failure to the user, stopping the app on an invalid API key."""
+    if "API key not valid" in str(error):
+        st.error("❌ Invalid API key. Please check your key and try again.")
+        st.stop()
+    st.error(f"Error generating content: {str(error)}")
 
-def analyze_transcript(transcript):
-    """Analyze transcript in chunks with progress tracking."""
+def generate_content(text, prompt, retry_count=3, use_cache=True, placeholder=None,
+                     model_name=GEMINI_MODEL, min_length=MIN_RESPONSE_LENGTH):
+    """Generate content using Gemini with enhanced error handling and content validation."""
+    try:
+        return _generate_text(text, prompt, retry_count, use_cache, placeholder, model_name,
+                              min_length)
+    except Exception as e:
+        report_generation_error(e)
+        return None
+
+def prefetch_fast_summary(video_id, transcript):
+    """
+    Start the fast summary on the shared event loop as soon as a transcript loads,
+    so the Fast Summary button usually finds it ready. Returns the future, or None
+    if the summary is already cached and no request is needed.
+    """
+    if (_disk_cache().get_video_field(video_id, "fast_summary", max_age=DISK_CACHE_TTL,
+                                      prompt_version=PROMPT_VERSION)
+            or _get_cached_response(_response_cache_key(transcript, FAST_SUMMARY_PROMPT))):
+        return None
+    # Resolve shared resources on the script thread before handing off
+    _response_cache()
+    _current_model(FAST_SUMMARY_PROMPT)
+    return asyncio.run_coroutine_threadsafe(
+        _generate_text_async(transcript, FAST_SUMMARY_PROMPT), _event_loop()
+    )
+
+def analyze_transcript(transcript, placeholder=None):
+    """
+    Analyze transcript in chunks with progress tracking.
+    The notes are streamed into placeholder when given.
+    Returns (notes, complete); complete is False when some parts failed.
+    """
+    # Gemini Flash's context window holds most transcripts whole,
+    # so only fall back to chunked map-reduce for very long videos
+    if len(transcript) < SINGLE_CALL_THRESHOLD:
+        return generate_content(transcript, SINGLE_PASS_PROMPT, placeholder=placeholder), True
+    
     chunks = chunk_text(transcript)
-    progress_bar = st.progress(0)
-    chunk_analyses = []
     
-    for i, chunk in enumerate(chunks):
-        st.write(f"Analyzing part {i+1} of {len(chunks)}...")
-        progress_bar.progress((i + 1) / len(chunks))
-        
-        chunk_summary = generate_content(chunk, CHUNK_PROMPT)
-        if chunk_summary:
-            chunk_analyses.append(chunk_summary)
+    # Resolve shared resources on the script thread before fanning out
+    _response_cache()
+    _disk_cache()
+    _current_model(CHUNK_PROMPT)
+    loop = _event_loop()
+    # Python < 3.10 binds a semaphore to the loop current at creation, so make it on loop
+    semaphore = asyncio.run_coroutine_threadsafe(
+        _new_semaphore(MAX_CONCURRENT_CHUNKS), loop
+    ).result()
+    
+    async def analyze_chunk(chunk):
+        async with semaphore:
+            return await _generate_text_async(chunk, CHUNK_PROMPT)
+    
+    # Chunks are independent, so run them concurrently on the shared loop
+    futures = {
+        asyncio.run_coroutine_threadsafe(analyze_chunk(chunk), loop): i
+        for i, chunk in enumerate(chunks)
+    }
+    results = [None] * len(chunks)
+    
+    # Report progress in a single status element updated in place
+    with st.status(f"Analyzing {len(chunks)} parts of the video...") as status:
+        failed = 0
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                failed += 1
+                # Open the status so the error written inside it is visible
+                status.update(expanded=True)
+                report_generation_error(e)
+            status.update(label=f"Analyzed part {done} of {len(chunks)}...")
+        if failed:
+            status.update(label=f"{failed} of {len(chunks)} parts could not be analyzed",
+                          state="error", expanded=True)
+        else:
+            status.update(label=f"Analyzed all {len(chunks)} parts", state="complete")
+    
+    # Keep transcript order for the final synthesis
+    chunk_analyses = [result for result in results if result]
+    if not chunk_analyses:
+        return None, False
     
     combined_analysis = "\n\n".join(chunk_analyses)
-    return generate_content(combined_analysis, FINAL_PROMPT)
+    # Notes missing some parts are not cached, so a later attempt can fill them in
+    complete = len(chunk_analyses) == len(chunks)
+    summary = generate_content(combined_analysis, FINAL_PROMPT, use_cache=complete,
+                               placeholder=placeholder)
+    return summary, complete
 
-def generate_qa_response(question, transcript, summary):
-    """Generate Q&A response."""
+def get_transcript_index(video_id, transcript):
+    """
+    Split the transcript into chunks and embed them once per video.
+    Returns the chunks and their unit-length embeddings as a numpy matrix;
+    embeddings are None when there are too few chunks to be worth ranking.
+    """
+    index = st.session_state.transcript_index
+    if index is None or index["video_id"] != video_id:
+        chunks = chunk_text(transcript, chunk_size=QA_CHUNK_SIZE)
+        embeddings = None
+        if len(chunks) > QA_CONTEXT_CHUNKS:
+            result = genai.embed_content(model=EMBEDDING_MODEL, content=chunks,
+                                         task_type="retrieval_document")
+            embeddings = np.array(result["embedding"], dtype=np.float32)
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        index = {"video_id": video_id, "chunks": chunks, "embeddings": embeddings}
+        st.session_state.transcript_index = index
+    return index["chunks"], index["embeddings"]
+
+def select_transcript_context(question, video_id, transcript):
+    """
+    Pick the transcript chunks most similar to the question, in transcript order.
+    Falls back to the full transcript if it is already short or embedding fails.
+    """
+    try:
+        chunks, embeddings = get_transcript_index(video_id, transcript)
+        if embeddings is None:
+            return transcript
+        result = genai.embed_content(model=EMBEDDING_MODEL, content=question,
+                                     task_type="retrieval_query")
+        scores = embeddings @ np.array(result["embedding"], dtype=np.float32)
+        top = np.sort(np.argpartition(scores, -QA_CONTEXT_CHUNKS)[-QA_CONTEXT_CHUNKS:])
+        return "\n\n[...]\n\n".join(chunks[i] for i in top)
+    except Exception:
+        return transcript
+
+def _qa_cache_key(video_id, question, summary):
+    """Key an answer by video, summary and the question with case and spacing normalized."""
+    normalized_question = " ".join(question.lower().split())
+    payload = json.dumps([video_id, normalized_question, summary, QA_MODEL])
+    return "qa:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def generate_qa_response(question, transcript, summary, placeholder=None):
+    """Generate Q&A response, streaming it into placeholder when given."""
+    video_id = st.session_state.current_video_id
+    # Repeated questions skip both the retrieval embedding and Gemini
+    answer_key = _qa_cache_key(video_id, question, summary)
+    cached_answer = _get_cached_response(answer_key)
+    if cached_answer is not None:
+        return cached_answer
+
+    transcript_context = select_transcript_context(question, video_id, transcript)
     prompt = f"""Based on the video transcript and summary, answer this question:
 
 Question: {question}
@@ -401,16 +788,21 @@ Question: {question}
 Summary:
 {summary}
 
-Transcript:
-{transcript}
+Relevant transcript excerpts:
+{transcript_context}
 
 Please provide a specific answer based on the video content."""
 
-    return generate_content(prompt, "")
+    answer = generate_content(prompt, "", placeholder=placeholder, model_name=QA_MODEL,
+                              min_length=MIN_QA_ANSWER_LENGTH)
+    if answer and _has_content(answer, MIN_QA_ANSWER_LENGTH):
+        _store_response(answer_key, answer)
+    return answer
 
-def create_markdown_download(summary, video_title, video_id, qa_history=None):
+def create_markdown_download(summary, video_title, video_id, qa_history=None,
+                             generated_on=None):
     """Create markdown format document with Q&A history."""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    timestamp = generated_on or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     markdown_content = f"""# Video Summary: {video_title}
 
 Generated on: {timestamp}
@@ -526,97 +918,122 @@ def setup_streamlit_ui():
     """, unsafe_allow_html=True)
 
 
+EDGE_DASH_RE = re.compile(r'^[-\s]+|[-\s]+$')
+
 def clean_table_content(text):
     """Clean table content by removing unwanted dashes and formatting."""
-    # Remove leading dashes/hyphens
-    cleaned = re.sub(r'^[-\s]*', '', text.strip())
-    # Remove trailing dashes/hyphens
-    cleaned = re.sub(r'[-\s]*$', '', cleaned)
-    # Remove standalone dashes
-    cleaned = re.sub(r'^---$', '', cleaned)
-    # Replace multiple spaces with single space
-    cleaned = re.sub(r'\s+', ' ', cleaned)
-    return cleaned.strip()
+    # Drop leading/trailing dashes, then collapse whitespace with str.split
+    return ' '.join(EDGE_DASH_RE.sub('', text).split())
+
+HEADING_RE = re.compile(r'^(#+)\s*(.*)')
+BULLET_RE = re.compile(r'^\s*[-*]\s+(.*)')
+NUMBERED_RE = re.compile(r'^\d+\.\s*(.*)')
+TABLE_SEPARATOR_RE = re.compile(r'^[\|\s\-:]+$')
+
+def add_formatted_runs(paragraph, text):
+    """Add text to a paragraph, making **marked** segments bold."""
+    if '**' not in text:
+        paragraph.add_run(text)
+        return paragraph
+    for i, part in enumerate(text.split('**')):
+        if not part:
+            continue  # "**" at either end or back to back leaves empty parts
+        run = paragraph.add_run(part)
+        if i % 2 == 1:  # Odd parts are bold
+            run.bold = True
+    return paragraph
+
+def add_heading(doc, match):
+    """Add a markdown heading, keeping its level."""
+    heading = doc.add_heading(match.group(2).strip(), len(match.group(1)))
+    for run in heading.runs:
+        run.bold = True
+
+def add_bullet(doc, match):
+    """Add a markdown bullet point."""
+    add_formatted_runs(doc.add_paragraph(style='List Bullet'), match.group(1).strip())
+
+def add_numbered_item(doc, match):
+    """Add a markdown numbered list item."""
+    add_formatted_runs(doc.add_paragraph(style='List Number'), match.group(1).strip())
+
+# Checked in order against each non-table line; unmatched lines become paragraphs
+LINE_HANDLERS = (
+    # (possible first characters, pattern, handler); most lines are plain
+    # paragraphs, so the cheap first-character test skips the regexes
+    ('#', HEADING_RE, add_heading),
+    ('-*', BULLET_RE, add_bullet),
+    ('0123456789', NUMBERED_RE, add_numbered_item),
+)
+
+def add_table(doc, table_lines):
+    """Add collected markdown table lines to the document as a Word table."""
+    rows = []
+    for table_line in table_lines:
+        if TABLE_SEPARATOR_RE.match(table_line):  # Skip separator lines
+            continue
+        cells = [clean_table_content(cell) for cell in table_line.strip().strip('|').split('|')]
+        if any(cells):  # Only add rows with content
+            rows.append(cells)
+    
+    if rows:
+        table = doc.add_table(rows=len(rows), cols=len(rows[0]))
+        table.style = 'Table Grid'
+        for i, row in enumerate(rows):
+            for j, cell in enumerate(row[:len(rows[0])]):
+                table.cell(i, j).text = cell
+                if i == 0:  # Make header row bold
+                    for run in table.cell(i, j).paragraphs[0].runs:
+                        run.bold = True
+    
+    doc.add_paragraph()  # Add spacing after table
 
 def convert_markdown_to_word(doc, text):
     """Convert markdown formatted text to proper Word formatting."""
-    lines = text.split('\n')
-    current_table_text = []
-    in_table = False
-
-    for line in lines:
-        # Handle table lines
-        if line.strip().startswith('|'):
-            current_table_text.append(line)
-            in_table = True
-            continue
-        elif in_table and line.strip():
-            current_table_text.append(line)
-            continue
-        elif in_table and not line.strip():
-            # Process completed table
-            if current_table_text:
-                # Create table
-                rows = []
-                for table_line in current_table_text:
-                    if not re.match(r'^[\|\s\-:]+$', table_line):  # Skip separator lines
-                        cells = [clean_table_content(cell) for cell in table_line.strip('|').split('|')]
-                        if any(cell.strip() for cell in cells):  # Only add rows with content
-                            rows.append(cells)
-                
-                if rows:
-                    table = doc.add_table(rows=len(rows), cols=len(rows[0]))
-                    table.style = 'Table Grid'
-                    for i, row in enumerate(rows):
-                        for j, cell in enumerate(row):
-                            table.cell(i, j).text = cell.strip()
-                            if i == 0:  # Make header row bold
-                                table.cell(i, j).paragraphs[0].runs[0].bold = True
-                
-                doc.add_paragraph()  # Add spacing after table
-            current_table_text = []
-            in_table = False
-            continue
+    table_lines = []
 
-        # Handle headings
-        if line.startswith('#'):
-            level = len(re.match(r'^#+', line).group())
-            text = line.lstrip('#').strip()
-            heading = doc.add_heading(text, level)
-            heading.runs[0].bold = True
-            continue
+    for line in text.split('\n'):
+        stripped = line.strip()
 
-        # Handle bullet points
-        if line.strip().startswith('- ') or line.strip().startswith('* '):
-            text = line.lstrip('- *').strip()
-            p = doc.add_paragraph(text, style='List Bullet')
+        # Collect table lines until a blank line ends the table
+        if stripped.startswith('|') or (table_lines and stripped):
+            table_lines.append(line)
             continue
-
-        # Handle numbered lists
-        if re.match(r'^\d+\.', line):
-            text = re.sub(r'^\d+\.\s*', '', line)
-            p = doc.add_paragraph(text, style='List Number')
+        if table_lines:
+            add_table(doc, table_lines)
+            table_lines = []
             continue
 
-        # Handle bold text
-        if '**' in line:
-            p = doc.add_paragraph()
-            parts = line.split('**')
-            for i, part in enumerate(parts):
-                run = p.add_run(part)
-                if i % 2 == 1:  # Odd parts are bold
-                    run.bold = True
+        if not stripped:
             continue
 
-        # Handle regular paragraphs
-        if line.strip():
-            doc.add_paragraph(line.strip())
+        first_char = stripped[0]
+        for prefixes, pattern, handler in LINE_HANDLERS:
+            match = first_char in prefixes and pattern.match(line)
+            if match:
+                handler(doc, match)
+                break
+        else:
+            # Regular paragraphs, with any bold text
+            add_formatted_runs(doc.add_paragraph(), stripped)
+
+    # Flush a table that runs to the end of the text
+    if table_lines:
+        add_table(doc, table_lines)
 
     return doc
 
 # Update create_word_document function
-def create_word_document(summary, video_title, video_id, qa_history=None):
-    """Create Word document with proper formatting."""
+@st.cache_data(max_entries=DOCUMENT_CACHE_ENTRIES, show_spinner=False)
+def _summary_document_bytes(summary, video_title, video_id):
+    """
+    Render the title, video link and summary once. The timestamp and Q&A
+    change per download, so create_word_document adds them.
+    """
+    # python-docx is heavy and only needed when a Word download is built
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
     doc = Document()
     
     # Add title
@@ -624,13 +1041,28 @@ def create_word_document(summary, video_title, video_id, qa_history=None):
     title.alignment = WD_ALIGN_PARAGRAPH.CENTER
     
     # Add metadata
-    doc.add_paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     doc.add_paragraph(f"Video Link: https://youtube.com/watch?v={video_id}")
     doc.add_paragraph()
     
     # Convert main content
     doc = convert_markdown_to_word(doc, summary)
     
+    bio = io.BytesIO()
+    doc.save(bio)
+    return bio.getvalue()
+
+def create_word_document(summary, video_title, video_id, qa_history=None, generated_on=None):
+    """Create Word document with proper formatting."""
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    # Reopen the already rendered summary instead of parsing the markdown again
+    doc = Document(io.BytesIO(_summary_document_bytes(summary, video_title, video_id)))
+    
+    # Add the timestamp between the title and the video link
+    timestamp = generated_on or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    doc.paragraphs[1].insert_paragraph_before(f"Generated on: {timestamp}")
+    
     # Add Q&A section
     if qa_history and len(qa_history) > 0:
         doc.add_heading("Questions & Answers", 1)
@@ -656,16 +1088,33 @@ def create_word_document(summary, video_title, video_id, qa_history=None):
     
     return doc
 
+@st.cache_data(max_entries=DOCUMENT_CACHE_ENTRIES, show_spinner=False)
+def word_document_bytes(summary, video_title, video_id, qa_pairs, generated_on):
+    """Serialized Word download, rebuilt only when the summary or Q&A pairs change."""
+    qa_history = [{"question": question, "answer": answer} for question, answer in qa_pairs]
+    doc = create_word_document(summary, video_title, video_id, qa_history, generated_on)
+    bio = io.BytesIO()
+    doc.save(bio)
+    return bio.getvalue()
+
+@st.cache_data(max_entries=DOCUMENT_CACHE_ENTRIES, show_spinner=False)
+def markdown_download_text(summary, video_title, video_id, qa_pairs, generated_on):
+    """Markdown download, rebuilt only when the summary or Q&A pairs change."""
+    qa_history = [{"question": question, "answer": answer} for question, answer in qa_pairs]
+    return create_markdown_download(summary, video_title, video_id, qa_history, generated_on)
+
 def setup_api_section():
     """Setup API key configuration."""
     # Check if limits are exceeded
-    if st.session_state.video_count >= 3 or st.session_state.query_count >= 5:
+    if (st.session_state.video_count >= VIDEO_LIMIT
+            or st.session_state.query_count >= QUESTION_LIMIT):
         st.error("🛑 Session limits reached!")
         st.warning("""
         ### You've reached the free usage limits:
-        - Videos analyzed: {}/3
-        - Questions asked: {}/5
-        """.format(st.session_state.video_count, st.session_state.query_count))
+        - Videos analyzed: {}/{}
+        - Questions asked: {}/{}
+        """.format(st.session_state.video_count, VIDEO_LIMIT,
+                   st.session_state.query_count, QUESTION_LIMIT))
         
         # Create two columns for the choices
         col1, col2 = st.columns(2)
@@ -743,8 +1192,8 @@ def show_footer():
 def handle_video_analysis(video_id, transcript):
     """Process video analysis and display results."""
 
-    if st.session_state.video_count >= 3:
-        st.error("🛑 Video analysis limit reached (3 videos per session)")
+    if st.session_state.video_count >= VIDEO_LIMIT:
+        st.error(f"🛑 Video analysis limit reached ({VIDEO_LIMIT} videos per session)")
         return
 
     # Display video thumbnail and title
@@ -766,35 +1215,78 @@ def handle_video_analysis(video_id, transcript):
             if not st.session_state.fast_summary_generated:
                 st.session_state.video_count += 1
                 with st.spinner("⏳ Generating fast summary..."):
-                    summary = generate_content(transcript, FAST_SUMMARY_PROMPT)
+                    summary = _disk_cache().get_video_field(video_id, "fast_summary",
+                                                            max_age=DISK_CACHE_TTL,
+                                                            prompt_version=PROMPT_VERSION)
+                    prefetch = st.session_state.summary_prefetch
+                    if not summary and prefetch is not None:
+                        try:
+                            summary = prefetch.result()
+                        except Exception:
+                            summary = None  # Fall back to a direct request below
+                    if not summary:
+                        summary = generate_content(transcript, FAST_SUMMARY_PROMPT,
+                                                   placeholder=st.empty())
                     if summary:
+                        _disk_cache().save_video(video_id, prompt_version=PROMPT_VERSION,
+                                                 fast_summary=summary)
                         st.session_state.current_summary = summary
+                        st.session_state.summary_generated_on = datetime.now().strftime(
+                            "%Y-%m-%d %H:%M:%S")
+                        st.session_state.summary_incomplete = False
                         st.session_state.fast_summary_generated = True
                         st.session_state.video_processed = False
-                        st.session_state.qa_history = []  # Reset Q&A history
+                        reset_qa_history()
                         st.rerun()
 
     # DETAILED SUMMARY BUTTON
     with col2:
         if st.button("🚀 Generate Detailed Notes", key="detailed_summary_button"):
-            if not st.session_state.video_processed:
+            # Incomplete notes can be generated again
+            if not st.session_state.video_processed or st.session_state.summary_incomplete:
                 st.session_state.video_count += 1
                 with st.spinner("🔄 Analyzing video content..."):
-                    summary = analyze_transcript(transcript)
+                    summary = _disk_cache().get_video_field(video_id, "detailed_summary",
+                                                            max_age=DISK_CACHE_TTL,
+                                                            prompt_version=PROMPT_VERSION)
+                    complete = True
+                    if not summary:
+                        summary, complete = analyze_transcript(transcript, placeholder=st.empty())
+                        if summary and complete:
+                            _disk_cache().save_video(video_id, prompt_version=PROMPT_VERSION,
+                                                     detailed_summary=summary)
                     if summary:
                         st.session_state.current_summary = summary
+                        st.session_state.summary_generated_on = datetime.now().strftime(
+                            "%Y-%m-%d %H:%M:%S")
+                        st.session_state.summary_incomplete = not complete
                         st.session_state.video_processed = True
                         st.session_state.fast_summary_generated = False
-                        st.session_state.word_doc_binary = None  # Reset word doc binary
-                        st.session_state.qa_history = []  # Reset Q&A history
+                        reset_qa_history()
                         st.rerun()
 
 
+def get_download_inputs():
+    """Arguments for the cached download builders, with Q&A as hashable pairs."""
+    qa_pairs = tuple((qa['question'], qa['answer']) for qa in st.session_state.qa_history)
+    return (
+        st.session_state.current_summary,
+        st.session_state.current_video_title,
+        st.session_state.current_video_id,
+        qa_pairs,
+        # Part of the cache key, so each summary keeps its own timestamp
+        st.session_state.summary_generated_on
+    )
+
 def handle_results_display():
     """Display analysis results and download options."""
     if st.session_state.current_summary:
         # Display success message
-        st.success("✨ Summary generated successfully!")
+        if st.session_state.summary_incomplete:
+            st.warning("⚠️ Some parts of the video could not be analyzed, so these notes are "
+                       "incomplete. Click Generate Detailed Notes to try again.")
+        else:
+            st.success("✨ Summary generated successfully!")
         
         # Display summary header and content
         if st.session_state.video_processed:
@@ -805,14 +1297,11 @@ def handle_results_display():
         st.markdown(st.session_state.current_summary)
         
         # Download options in the main window
+        download_inputs = get_download_inputs()
+        markdown_content = markdown_download_text(*download_inputs)
+        word_doc_binary = word_document_bytes(*download_inputs)
         col1, col2 = st.columns(2)
         with col1:
-            markdown_content = create_markdown_download(
-                st.session_state.current_summary,
-                st.session_state.current_video_title,
-                st.session_state.current_video_id,
-                st.session_state.qa_history
-            )
             st.download_button(
                 label="📥 Download Markdown",
                 data=markdown_content,
@@ -821,20 +1310,9 @@ def handle_results_display():
                 key="markdown_download_main"
             )
         with col2:
-            if st.session_state.word_doc_binary is None:
-                doc = create_word_document(
-                    st.session_state.current_summary,
-                    st.session_state.current_video_title,
-                    st.session_state.current_video_id,
-                    st.session_state.qa_history
-                )
-                bio = io.BytesIO()
-                doc.save(bio)
-                st.session_state.word_doc_binary = bio.getvalue()
-            
             st.download_button(
                 label="📄 Download Word",
-                data=st.session_state.word_doc_binary,
+                data=word_doc_binary,
                 file_name=f"video_summary_{st.session_state.current_video_id}.docx",
                 mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
                 key="word_download_main"
@@ -851,17 +1329,29 @@ def handle_results_display():
         )
         st.sidebar.download_button(
             label="📄 Download Word",
-            data=st.session_state.word_doc_binary,
+            data=word_doc_binary,
             file_name=f"video_summary_{st.session_state.current_video_id}.docx",
             mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
             key="word_download_sidebar"
         )
         
+def reset_qa_history():
+    """Clear the Q&A history, its rendered markdown and the latest answer."""
+    st.session_state.qa_history = deque(maxlen=QA_HISTORY_SIZE)
+    st.session_state.qa_history_md = ""
+    st.session_state.latest_qa = None
+
+@st.fragment
 def handle_qa_section():
-    """Handle Q&A functionality."""
+    """
+    Handle Q&A functionality.
+    Runs as a fragment, so submitting a question reruns only this section
+    while the answer streams in; a full rerun then refreshes the downloads
+    and sidebar counters.
+    """
 
-    if st.session_state.query_count >= 5:
-        st.error("🛑 Question limit reached (5 questions per session)")
+    if st.session_state.query_count >= QUESTION_LIMIT:
+        st.error(f"🛑 Question limit reached ({QUESTION_LIMIT} questions per session)")
         return
 
     # Ensure that a summary (Fast or Detailed) has been generated
@@ -872,21 +1362,23 @@ def handle_qa_section():
     st.markdown('<h2 class="section-header">❓ Ask Questions About the Video</h2>', 
                unsafe_allow_html=True)
 
-    # Display existing Q&A history
-    if st.session_state.qa_history:
+    # Display earlier Q&A as one pre-rendered markdown block; the latest
+    # answer is shown below the input instead
+    if st.session_state.qa_history_md:
         st.markdown("### Previous Questions & Answers")
-        for qa in st.session_state.qa_history:
-            st.markdown(f"**Q: {qa['question']}**")
-            st.markdown(f"A: {qa['answer']}\n")
-
-    # Input box for the user's question
-    user_question = st.text_input(
-        "Enter your question:",
-        key="qa_input"
-    )
+        st.markdown(st.session_state.qa_history_md)
+
+    # Input box for the user's question; the form only reruns on submit
+    with st.form("qa_form", clear_on_submit=False):
+        user_question = st.text_input(
+            "Enter your question:",
+            key="qa_input"
+        )
+        submitted = st.form_submit_button("Ask")
 
-    # Process user question only if input is not empty and it's a new input
-    if user_question and st.session_state.get("last_qa_input", "") != user_question:
+    # Process user question only on submit, if input is not empty and it's a new input
+    if (submitted and user_question
+            and st.session_state.get("last_qa_input", "") != user_question):
         # Save the input to prevent repeated processing
         st.session_state.last_qa_input = user_question
 
@@ -897,40 +1389,70 @@ def handle_qa_section():
         summary = st.session_state.current_summary
         transcript = st.session_state.current_transcript
 
-        with st.spinner("🤔 Analyzing your question..."):
-            answer = generate_qa_response(user_question, transcript, summary)
-            if answer:
-                # Add to Q&A history
-                st.session_state.qa_history.append({
-                    "question": user_question,
-                    "answer": answer
-                })
-
-                # Update the Word document binary
-                doc = create_word_document(
-                    st.session_state.current_summary,
-                    st.session_state.current_video_title,
-                    st.session_state.current_video_id,
-                    st.session_state.qa_history
-                )
-                bio = io.BytesIO()
-                doc.save(bio)
-                st.session_state.word_doc_binary = bio.getvalue()
-
-                # Display the latest answer
-                st.markdown("### 💡 Latest Answer")
-                st.markdown(answer)
+        # Stream the answer in as it is generated; the first tokens replace
+        # the waiting message, so no spinner is needed
+        st.markdown("### 💡 Latest Answer")
+        answer_placeholder = st.empty()
+        answer_placeholder.info("🤔 Analyzing your question...")
+        answer = generate_qa_response(user_question, transcript, summary,
+                                      placeholder=answer_placeholder)
+        if not answer:
+            answer_placeholder.empty()
+            return
+
+        # Show the final formatted answer
+        answer_placeholder.markdown(answer)
+
+        # The previous latest answer moves up into the history block
+        latest_qa = st.session_state.latest_qa
+        if latest_qa:
+            st.session_state.qa_history_md += (
+                f"**Q: {latest_qa['question']}**\n\nA: {latest_qa['answer']}\n\n"
+            )
+        st.session_state.latest_qa = {"question": user_question, "answer": answer}
+        st.session_state.qa_history.append(st.session_state.latest_qa)
+
+        # Rerun the whole app so the downloads and counters include this answer.
+        # Not at the question limit, where the full rerun would replace the
+        # page with the limit notice before the answer could be read.
+        if st.session_state.query_count < QUESTION_LIMIT:
+            st.rerun()
+    elif st.session_state.latest_qa:
+        st.markdown("### 💡 Latest Answer")
+        st.markdown(st.session_state.latest_qa["answer"])
 
                 
 def show_usage_stats():
     """Display usage statistics."""
-    st.sidebar.markdown("### Usage Statistics")
-    st.sidebar.text(f"Videos Analyzed: {st.session_state.video_count}/3")  # Changed from 10 to 3
-    st.sidebar.text(f"Questions Asked: {st.session_state.query_count}/5")   # Changed from 25 to 5
-    if st.session_state.video_count >= 2 or st.session_state.query_count >= 4:  # Changed thresholds
+    # One element instead of three; Streamlit drops any element a rerun skips,
+    # so the stats are rendered every run but as cheaply as possible
+    st.sidebar.markdown(
+        "### Usage Statistics\n"
+        f"Videos Analyzed: {st.session_state.video_count}/{VIDEO_LIMIT}  \n"
+        f"Questions Asked: {st.session_state.query_count}/{QUESTION_LIMIT}"
+    )
+    # Warn one use before either limit
+    if (st.session_state.video_count >= VIDEO_LIMIT - 1
+            or st.session_state.query_count >= QUESTION_LIMIT - 1):
         st.sidebar.warning("⚠️ Approaching usage limit!")
         
 
+def show_cache_controls():
+    """
+    Let the operator clear every cached transcript, title and AI response.
+    The caches are shared by all visitors, so the button only appears when the
+    app is opened with ?admin=<CACHE_ADMIN_TOKEN>.
+    """
+    admin_token = os.getenv("CACHE_ADMIN_TOKEN")
+    if not admin_token or not hmac.compare_digest(st.query_params.get("admin", ""), admin_token):
+        return
+    if st.sidebar.button("🧹 Clear cache", key="clear_cache_button"):
+        _disk_cache().clear()
+        _response_cache().clear()
+        st.cache_data.clear()
+        st.sidebar.success("Cache cleared")
+
+
 def main():
     """Main application function."""
     # Setup UI
@@ -938,10 +1460,11 @@ def main():
     
     # Add this line to show usage stats
     show_usage_stats()
+    show_cache_controls()
     
     # Get and validate API key
     api_key = setup_api_section()
-    genai.configure(api_key=api_key)
+    configure_gemini(api_key)
     
     # Show user guide
     show_quick_guide()
@@ -951,23 +1474,38 @@ def main():
                                 placeholder="https://www.youtube.com/watch?v=... or youtu.be/...")
     
     if youtube_link:
-        # Process the URL and get video information
-        video_id, transcript = process_video_url(youtube_link)
+        if youtube_link != st.session_state.last_youtube_link:
+            # Process the URL and get video information
+            video_id, transcript, video_title = process_video_url(youtube_link)
+            # Only remember links that loaded, so a failed one is retried
+            if video_id and transcript:
+                st.session_state.last_youtube_link = youtube_link
+        else:
+            # Same link as the last rerun: reuse what is already loaded
+            video_id = st.session_state.current_video_id
+            transcript = st.session_state.current_transcript
         
         if video_id and transcript:
             # Only process if it's a new video
             if video_id != st.session_state.current_video_id:
-                video_title = get_youtube_title(video_id, youtube_link)
-                
                 # Store current video information
                 st.session_state.current_video_id = video_id
                 st.session_state.current_video_title = video_title
                 st.session_state.current_transcript = transcript
                 # Reset previous results
                 st.session_state.current_summary = None
-                st.session_state.word_doc_binary = None
+                st.session_state.summary_incomplete = False
                 st.session_state.video_processed = False
-                st.session_state.qa_history = []
+                st.session_state.fast_summary_generated = False
+                reset_qa_history()
+                # Speculatively start the fast summary while the user decides.
+                # Only the user's own clicks count toward VIDEO_LIMIT; prefetches
+                # have their own, separate cap
+                st.session_state.summary_prefetch = None
+                if st.session_state.prefetch_count < PREFETCH_LIMIT:
+                    st.session_state.summary_prefetch = prefetch_fast_summary(video_id, transcript)
+                    if st.session_state.summary_prefetch is not None:
+                        st.session_state.prefetch_count += 1
             
             # Handle video analysis
             handle_video_analysis(video_id, transcript)
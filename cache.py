@@ -0,0 +1,219 @@
+# SQLite-backed cache shared by every Streamlit session and worker restart
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+
+CACHE_PATH = os.getenv(
+    "APP_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "gemini_flash_tube_cache.sqlite3")
+)
+
+SIZE_LIMIT = 500_000_000  # Bytes of live data before the oldest rows are evicted
+PRUNE_INTERVAL = 600  # Seconds between pruning passes triggered by writes
+
+# Per-video columns that can be read and written through DiskCache
+VIDEO_FIELDS = ("transcript", "title", "fast_summary", "detailed_summary")
+# Fields that depend on the prompts and are tagged with a prompt version
+SUMMARY_FIELDS = ("fast_summary", "detailed_summary")
+
+
+class DiskCache:
+    """
+    Small key/value store persisted in SQLite, plus a per-video table for
+    transcripts (zlib-compressed), titles and summaries. Each field keeps its
+    own write time, so saving one never makes another look fresh. Summaries
+    carry the prompt version they were generated with and miss when it changes.
+    Values must be JSON serializable. Storage errors are swallowed so a
+    missing or read-only cache never breaks the app; it just misses.
+    Writes periodically drop expired entries, videos older than max_age
+    seconds and, past size_limit bytes, the oldest rows of both tables.
+    """
+
+    def __init__(self, path=CACHE_PATH, size_limit=SIZE_LIMIT, max_age=None):
+        self.path = path
+        self.size_limit = size_limit
+        self.max_age = max_age
+        self.next_prune = time.monotonic() + PRUNE_INTERVAL
+        self.lock = threading.Lock()
+        try:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+                )
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS videos ("
+                    "video_id TEXT PRIMARY KEY, transcript BLOB, title TEXT, "
+                    "fast_summary TEXT, detailed_summary TEXT, updated_at INTEGER, "
+                    "prompt_version TEXT, transcript_at INTEGER, title_at INTEGER, "
+                    "fast_summary_at INTEGER, detailed_summary_at INTEGER)"
+                )
+                # Caches created by earlier versions lack the newer columns
+                columns = {row[1] for row in self.conn.execute("PRAGMA table_info(videos)")}
+                added_columns = [("prompt_version", "TEXT")]
+                added_columns += [(f"{field}_at", "INTEGER") for field in VIDEO_FIELDS]
+                for column, column_type in added_columns:
+                    if column not in columns:
+                        self.conn.execute(f"ALTER TABLE videos ADD COLUMN {column} {column_type}")
+        except sqlite3.Error:
+            self.conn = None
+        # Drop anything that expired while the app was down
+        self.prune()
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired."""
+        if self.conn is None:
+            return default
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error:
+            return default
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return default
+        return json.loads(row[0])
+
+    def set(self, key, value, expire=None):
+        """Store value under key, optionally expiring after expire seconds."""
+        if self.conn is None:
+            return
+        expires_at = time.time() + expire if expire else None
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires_at)
+                )
+        except sqlite3.Error:
+            pass
+        self._maybe_prune()
+
+    def get_video_field(self, video_id, field, max_age=None, prompt_version=None):
+        """
+        Return one cached field for a video, or None if missing, older than
+        max_age seconds, or generated with a different prompt_version.
+        """
+        if field not in VIDEO_FIELDS:
+            raise ValueError(f"Unknown video field: {field}")
+        if self.conn is None:
+            return None
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    f"SELECT {field}, {field}_at, prompt_version FROM videos WHERE video_id = ?",
+                    (video_id,)
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None or row[0] is None:
+            return None
+        # Rows written before per-field times existed have none; treat them as stale
+        if max_age and (row[1] is None or row[1] < time.time() - max_age):
+            return None
+        if prompt_version is not None and row[2] != prompt_version:
+            return None
+        if field == "transcript":
+            return json.loads(zlib.decompress(row[0]))
+        return row[0]
+
+    def save_video(self, video_id, prompt_version=None, **fields):
+        """
+        Insert or update the given fields for a video.
+        Saving with a new prompt_version drops summaries made under the old one.
+        """
+        unknown = set(fields) - set(VIDEO_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown video fields: {', '.join(sorted(unknown))}")
+        if self.conn is None or not fields:
+            return
+        if "transcript" in fields:
+            fields["transcript"] = zlib.compress(json.dumps(fields["transcript"]).encode("utf-8"))
+        now = int(time.time())
+        for field in list(fields):
+            fields[f"{field}_at"] = now
+        columns = list(fields)
+        updates = [f"{column} = excluded.{column}" for column in columns]
+        if prompt_version is not None:
+            fields["prompt_version"] = prompt_version
+            columns.append("prompt_version")
+            updates += [
+                f"{column} = CASE WHEN videos.prompt_version IS excluded.prompt_version "
+                f"THEN videos.{column} ELSE NULL END"
+                for column in SUMMARY_FIELDS if column not in columns
+            ]
+            updates.append("prompt_version = excluded.prompt_version")
+        updates = ", ".join(updates)
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    f"INSERT INTO videos (video_id, {', '.join(columns)}, updated_at) "
+                    f"VALUES (?, {', '.join('?' for _ in columns)}, ?) "
+                    f"ON CONFLICT(video_id) DO UPDATE SET {updates}, updated_at = excluded.updated_at",
+                    (video_id, *fields.values(), now)
+                )
+        except sqlite3.Error:
+            pass
+        self._maybe_prune()
+
+    def _used_bytes(self):
+        """Bytes held by live pages; freed pages are reused rather than returned to the OS."""
+        page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+    def _maybe_prune(self):
+        """Prune at most once every PRUNE_INTERVAL seconds."""
+        if time.monotonic() < self.next_prune:
+            return
+        self.next_prune = time.monotonic() + PRUNE_INTERVAL
+        self.prune()
+
+    def prune(self):
+        """Drop expired entries and old videos, then evict the oldest rows while over size_limit."""
+        if self.conn is None:
+            return
+        now = time.time()
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (now,)
+                )
+                if self.max_age:
+                    self.conn.execute(
+                        "DELETE FROM videos WHERE updated_at < ?", (now - self.max_age,)
+                    )
+                # Each round evicts the oldest tenth of both tables
+                for _ in range(10):
+                    if self._used_bytes() <= self.size_limit:
+                        break
+                    self.conn.execute(
+                        "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                        "ORDER BY expires_at IS NULL, expires_at "
+                        "LIMIT (SELECT COUNT(*) / 10 + 1 FROM cache))"
+                    )
+                    self.conn.execute(
+                        "DELETE FROM videos WHERE video_id IN (SELECT video_id FROM videos "
+                        "ORDER BY updated_at LIMIT (SELECT COUNT(*) / 10 + 1 FROM videos))"
+                    )
+        except sqlite3.Error:
+            pass
+
+    def clear(self):
+        """Remove every cached entry and video."""
+        if self.conn is None:
+            return
+        try:
+            with self.lock, self.conn:
+                self.conn.execute("DELETE FROM cache")
+                self.conn.execute("DELETE FROM videos")
+        except sqlite3.Error:
+            pass